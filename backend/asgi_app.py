@@ -0,0 +1,172 @@
+import asyncio
+import os
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import ClientDisconnect, Request
+from starlette.responses import JSONResponse, PlainTextResponse, Response
+from starlette.routing import Route
+
+from app import (
+    MULTIPART_OVERHEAD, PREDICT_TIMEOUT, QueueFullError, batcher, count_outcome, decode_pool, format_prediction, model_ready,
+    parse_top_k, prepare_image, readiness, result_cache, shutdown, start_model_loading
+)
+from metrics import REQUESTS, STAGE_LATENCY, registry
+from preprocessing import MAX_UPLOAD_BYTES, ImageRejectedError
+
+# Slow mobile uploads are received here without holding an inference thread
+UPLOAD_TIMEOUT = float(os.environ.get("UPLOAD_TIMEOUT", 120))
+DISCONNECT_POLL_INTERVAL = float(os.environ.get("DISCONNECT_POLL_INTERVAL", 0.25))
+
+# Same body limit as the Flask app's MAX_CONTENT_LENGTH
+MAX_BODY_BYTES = MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+# Only fully received bytes reach this point; decode and inference run off the event loop
+async def infer(img_bytes, top_k=0):
+    loop = asyncio.get_running_loop()
+    confidence_scores, img_array, cache_keys = await loop.run_in_executor(decode_pool, prepare_image, img_bytes)
+    if confidence_scores is None:
+        # Cancelling the wrapped future drops the image from the batcher queue if it hasn't run yet
+        with STAGE_LATENCY.time(stage="wait"):
+            confidence_scores = await asyncio.wrap_future(batcher.submit(img_array))
+        result_cache.put(cache_keys, confidence_scores)
+    return format_prediction(confidence_scores, top_k)
+
+
+# Await `coro`, cancelling it as soon as the client goes away
+async def until_disconnected(request, coro):
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                raise ClientDisconnected()
+    finally:
+        task.cancel()
+
+
+# Count body bytes as they arrive, so a chunked upload without Content-Length stops at the limit
+def limit_body(receive, max_bytes):
+    received = 0
+
+    async def limited_receive():
+        nonlocal received
+        message = await receive()
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise UploadTooLarge(f"Upload is larger than {max_bytes} bytes")
+        return message
+
+    return limited_receive
+
+
+async def read_upload(request):
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        raise UploadTooLarge(f"Upload is {content_length} bytes, limit is {MAX_BODY_BYTES}")
+
+    limited = Request(request.scope, limit_body(request.receive, MAX_BODY_BYTES))
+    form = await limited.form(max_files=1, max_fields=10)
+    try:
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            return None
+        return await upload.read(MAX_UPLOAD_BYTES + 1)
+    finally:
+        await form.close()
+
+
+async def predict(request):
+    try:
+        top_k = parse_top_k(request.query_params.get("top_k"))
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    if not model_ready():
+        REQUESTS.inc(endpoint="predict", outcome="not_ready")
+        return JSONResponse({"error": "Model is loading"}, status_code=503, headers={"Retry-After": "1"})
+
+    try:
+        with STAGE_LATENCY.time(stage="read"):
+            img_bytes = await asyncio.wait_for(read_upload(request), UPLOAD_TIMEOUT)
+    except asyncio.TimeoutError:
+        return JSONResponse({"error": "Upload timed out"}, status_code=408)
+    except UploadTooLarge as e:
+        return JSONResponse({"error": str(e)}, status_code=413)
+    except ClientDisconnect:
+        # Gone mid-upload; the status only shows up in access logs
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    if img_bytes is None:
+        return JSONResponse({"error": "No file uploaded"}, status_code=400)
+
+    try:
+        result, unknown = await asyncio.wait_for(until_disconnected(request, infer(img_bytes, top_k)), PREDICT_TIMEOUT)
+        count_outcome("predict", unknown)
+    except Exception as e:
+        count_outcome("predict", error=e)
+        if isinstance(e, ImageRejectedError):
+            return JSONResponse({"error": str(e)}, status_code=413)
+        if isinstance(e, QueueFullError):
+            return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+        if isinstance(e, asyncio.TimeoutError):
+            return JSONResponse({"error": "Prediction timed out"}, status_code=504)
+        if isinstance(e, ClientDisconnected):
+            # Nobody is listening; the status only shows up in access logs
+            return JSONResponse({"error": "Client disconnected"}, status_code=499)
+        return JSONResponse({"error": str(e)})
+
+    # The prediction is already serialized
+    with STAGE_LATENCY.time(stage="serialize"):
+        return Response(result, media_type="application/json")
+
+
+async def metrics(request):
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+async def healthz(request):
+    return JSONResponse({"status": "ok"})
+
+
+async def readyz(request):
+    body, status = readiness()
+    return JSONResponse(body, status_code=status)
+
+
+async def startup():
+    start_model_loading()
+
+
+async def stop():
+    await asyncio.get_running_loop().run_in_executor(None, shutdown, PREDICT_TIMEOUT)
+
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict, methods=["POST"]),
+        Route("/healthz", healthz, methods=["GET"]),
+        Route("/readyz", readyz, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])],
+    on_startup=[startup],
+    on_shutdown=[stop]
+)
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
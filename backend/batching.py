@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class QueueFullError(Exception):
+    """Raised when the batching queue cannot accept more requests."""
+
+
+class MicroBatcher:
+    """Collects concurrent single-image requests into one model call.
+
+    Requests are held for at most ``max_wait_ms`` (or until ``max_batch_size``
+    items are waiting), stacked into one array and passed to ``predict_fn``.
+    Each caller gets a ``Future`` resolved with its own row of the output.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5.0, max_queue_size=256):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.max_queue_size = int(max_queue_size)
+
+        self._queue = queue.Queue(maxsize=self.max_queue_size)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping.clear()
+                self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        # Stop accepting new work and let the worker drain what is queued
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def submit(self, item):
+        if self._stopping.is_set():
+            raise QueueFullError("Batcher is shutting down")
+        self.start()
+
+        future = Future()
+        try:
+            self._queue.put_nowait((item, future))
+        except queue.Full:
+            raise QueueFullError("Prediction queue is full")
+        return future
+
+    def _run(self):
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        batch.append(self._queue.get(timeout=remaining))
+                    else:
+                        batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._process(batch)
+
+    def _process(self, batch):
+        # Skip callers that gave up (cancelled futures) before we got to them
+        live = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not live:
+            return
+
+        try:
+            inputs = np.stack([item for item, _ in live])
+            outputs = self.predict_fn(inputs)
+        except Exception as e:
+            for _, future in live:
+                future.set_exception(e)
+            return
+
+        for (_, future), output in zip(live, outputs):
+            future.set_result(output)
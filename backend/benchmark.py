@@ -0,0 +1,54 @@
+import argparse
+import time
+
+import numpy as np
+
+
+def percentile_ms(samples, q):
+    return float(np.percentile(samples, q) * 1000.0)
+
+
+def measure(fn, batch, iterations):
+    # One untimed call so first-use costs don't skew the numbers
+    fn(batch)
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(batch)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare model.predict against the compiled inference runner")
+    parser.add_argument("--model", default="model/plant_disease_model.h5")
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    args = parser.parse_args()
+
+    from inference import InferenceRunner, configure_threads
+    import tensorflow as tf
+
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    runner = InferenceRunner(model, warmup_batch_sizes=batch_sizes)
+
+    print(f"{'batch':>5} {'path':<14} {'p50 ms':>9} {'p99 ms':>9} {'img/s':>9}")
+    rng = np.random.default_rng(0)
+    for size in batch_sizes:
+        pixels = rng.integers(0, 256, (size, 128, 128, 3), dtype=np.uint8)
+        scaled = pixels.astype(np.float32) / 255.0
+        for name, fn, batch in (("model.predict", lambda b: model.predict(b, verbose=0), scaled),
+                                ("runner", runner, pixels)):
+            samples = measure(fn, batch, args.iterations)
+            throughput = size / float(np.mean(samples))
+            print(f"{size:>5} {name:<14} {percentile_ms(samples, 50):>9.2f} "
+                  f"{percentile_ms(samples, 99):>9.2f} {throughput:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class MemoryBackend:
+    """In-process LRU of score vectors with an entry limit and TTL."""
+
+    def __init__(self, max_entries=10000, ttl=3600):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """Cache shared by all workers on one machine through a SQLite file."""
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = float(ttl)
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Use a throwaway connection so none is inherited by forked workers
+        conn = sqlite3.connect(self.path, timeout=5)
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+        conn.close()
+
+    # sqlite3 connections can't be shared across threads
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM results WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return np.frombuffer(row[0], dtype=np.float32)
+
+    def put(self, key, value):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, expires) VALUES (?, ?, ?)",
+                (key, np.asarray(value, dtype=np.float32).tobytes(), time.time() + self.ttl)
+            )
+
+    # Drop expired rows and rows written for another model version
+    def clear(self, keep_prefix=None):
+        with self._connect() as conn:
+            if keep_prefix is None:
+                conn.execute("DELETE FROM results")
+            else:
+                conn.execute(
+                    "DELETE FROM results WHERE expires <= ? OR substr(key, 1, ?) != ?",
+                    (time.time(), len(keep_prefix), keep_prefix)
+                )
+
+
+# Identifies one version of a model file; a SavedModel is a directory whose
+# graph file changes on every export
+def model_fingerprint(model_path):
+    path = model_path
+    if os.path.isdir(path):
+        path = os.path.join(path, "saved_model.pb")
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+class ResultCache:
+    """Caches model score vectors by upload content and, optionally, perceptual hash.
+
+    Keys are prefixed with the fingerprint of the model this process has
+    loaded (see set_model), so scores from one model version are never served
+    for another. Nothing is cached until a model is set.
+    """
+
+    def __init__(self, local=None, shared=None):
+        self.local = local if local is not None else MemoryBackend()
+        self.shared = shared
+        self.stats = {"hits": 0, "perceptual_hits": 0, "misses": 0}
+
+        self._fingerprint = None
+        self._lock = threading.Lock()
+
+    # Called once the model is loaded; a new fingerprint flushes the local LRU
+    # and drops shared rows written for other models. None disables caching
+    def set_model(self, fingerprint):
+        with self._lock:
+            if fingerprint == self._fingerprint:
+                return
+            self.local.clear()
+            if self.shared is not None and fingerprint is not None:
+                self.shared.clear(keep_prefix=fingerprint)
+            self._fingerprint = fingerprint
+
+    # Keys are None while no model is set; get() and put() ignore them
+    def content_key(self, img_bytes):
+        if self._fingerprint is None:
+            return None
+        return f"{self._fingerprint}:c:{hashlib.sha256(img_bytes).hexdigest()}"
+
+    # Average hash over 8x8 blocks of the preprocessed 128x128 image, so re-encodes still match
+    def perceptual_key(self, img_array):
+        if self._fingerprint is None:
+            return None
+        gray = np.asarray(img_array, dtype=np.float32).mean(axis=2)
+        height, width = gray.shape
+        blocks = gray.reshape(16, height // 16, 16, width // 16).mean(axis=(1, 3))
+        bits = np.packbits(blocks > blocks.mean())
+        return f"{self._fingerprint}:p:{bits.tobytes().hex()}"
+
+    def get(self, key):
+        if key is None:
+            return None
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.put(key, value)
+        if value is not None:
+            with self._lock:
+                self.stats["perceptual_hits" if ":p:" in key else "hits"] += 1
+        return value
+
+    def miss(self):
+        with self._lock:
+            self.stats["misses"] += 1
+
+    def put(self, keys, value):
+        value = np.asarray(value, dtype=np.float32)
+        for key in keys:
+            if key is None:
+                continue
+            self.local.put(key, value)
+            if self.shared is not None:
+                self.shared.put(key, value)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["perceptual_hits"] + stats["misses"]
+        hits = stats["hits"] + stats["perceptual_hits"]
+        return dict(
+            stats,
+            model=self._fingerprint,
+            entries=len(self.local),
+            hit_rate=hits / lookups if lookups else 0.0
+        )
@@ -0,0 +1,79 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+import numpy as np
+
+from loadtest import multipart_body, post, sample_image
+
+
+def poll(check, start, timeout):
+    while time.perf_counter() - start < timeout:
+        try:
+            if check():
+                return time.perf_counter() - start
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.02)
+    return float("nan")
+
+
+def get_status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+# Start a fresh server and time each milestone from process start
+def measure(backend, model_path, port, body, content_type, timeout):
+    env = dict(os.environ, MODEL_BACKEND=backend, CACHE_MAX_ENTRIES="0")
+    if model_path:
+        env["MODEL_PATH"] = model_path
+    base = f"http://127.0.0.1:{port}"
+
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--bind", f"127.0.0.1:{port}", "--workers", "1"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        healthy = poll(lambda: get_status(base + "/healthz") == 200, start, timeout)
+        ready = poll(lambda: get_status(base + "/readyz") == 200, start, timeout)
+        predicted = poll(lambda: post(base + "/predict", body, content_type)[0] == 200, start, timeout)
+    finally:
+        server.terminate()
+        server.wait()
+    return healthy, ready, predicted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time from process start to first successful prediction")
+    parser.add_argument(
+        "--models",
+        default="keras:model/plant_disease_model.h5,keras:model/plant_disease_model.keras,savedmodel,int8",
+        help="Comma-separated backend[:path] entries to compare"
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5056)
+    parser.add_argument("--timeout", type=float, default=300)
+    args = parser.parse_args()
+
+    body, content_type = multipart_body(sample_image())
+
+    print(f"{'model':<45} {'healthz s':>10} {'readyz s':>10} {'1st pred s':>11}")
+    for entry in args.models.split(","):
+        backend, _, model_path = entry.partition(":")
+        runs = np.array([measure(backend, model_path, args.port, body, content_type, args.timeout)
+                         for _ in range(args.runs)])
+        healthy, ready, predicted = np.median(runs, axis=0)
+        print(f"{entry:<45} {healthy:>10.2f} {ready:>10.2f} {predicted:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
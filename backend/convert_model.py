@@ -0,0 +1,53 @@
+import argparse
+import os
+import shutil
+
+import tensorflow as tf
+
+from inference import IMG_SHAPE, MODEL_FILES
+
+
+# Native Keras format; loads faster and more reliably than legacy .h5
+def save_keras(model, path):
+    model.save(path)
+
+
+# SavedModel with a traced `serve` endpoint taking uint8 pixels (scaled to [0, 1] in the graph)
+def save_savedmodel(model, path):
+    archive = tf.keras.export.ExportArchive()
+    archive.track(model)
+    archive.add_endpoint(
+        name="serve",
+        fn=lambda images: model(tf.cast(images, tf.float32) * (1.0 / 255.0), training=False),
+        input_signature=[tf.TensorSpec(shape=(None,) + IMG_SHAPE, dtype=tf.uint8)]
+    )
+
+    # Write next to the target and swap, so a running server never sees a half-written model
+    tmp_path = path.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    archive.write_out(tmp_path)
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the trained .h5 model to faster-loading formats")
+    parser.add_argument("--model", default=MODEL_FILES["keras"])
+    parser.add_argument("--formats", default="keras,savedmodel")
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    for fmt in args.formats.split(","):
+        if fmt == "keras":
+            path = os.path.splitext(args.model)[0] + ".keras"
+            save_keras(model, path)
+        elif fmt == "savedmodel":
+            path = MODEL_FILES["savedmodel"]
+            save_savedmodel(model, path)
+        else:
+            parser.error(f"Unknown format {fmt!r}, expected keras or savedmodel")
+        print(f"{fmt}: wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import os
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from preprocessing import IMG_SIZE, load_image
+
+# Same extensions Keras' flow_from_directory accepts
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".ppm", ".tif", ".tiff")
+
+# Decoded images held for reshuffling a cached dataset (~49 KB each)
+SHUFFLE_BUFFER = 1024
+
+
+def class_names(dataset_path):
+    return sorted(
+        name for name in os.listdir(dataset_path)
+        if os.path.isdir(os.path.join(dataset_path, name))
+    )
+
+
+def class_files(class_dir):
+    files = []
+    for root, _, names in sorted(os.walk(class_dir), key=lambda entry: entry[0]):
+        files.extend(os.path.join(root, name) for name in sorted(names) if name.lower().endswith(IMAGE_EXTENSIONS))
+    return files
+
+
+# Per-class split with the same semantics as ImageDataGenerator(validation_split=...):
+# files are sorted and the first `validation_split` of every class is validation
+def split_dataset(dataset_path, validation_split=0.2):
+    names = class_names(dataset_path)
+    splits = {"training": ([], []), "validation": ([], [])}
+
+    for label, name in enumerate(names):
+        files = class_files(os.path.join(dataset_path, name))
+        boundary = int(validation_split * len(files))
+        for subset, subset_files in (("validation", files[:boundary]), ("training", files[boundary:])):
+            splits[subset][0].extend(subset_files)
+            splits[subset][1].extend([label] * len(subset_files))
+
+    return names, splits
+
+
+def _decode(path):
+    return load_image(path.decode())
+
+
+# Stream (images, one-hot labels) batches; images are scaled to [0, 1] after batching
+def make_dataset(files, labels, num_classes, batch_size, shuffle=False, cache_path=None, seed=0):
+    ds = tf.data.Dataset.from_tensor_slices((files, np.asarray(labels, dtype=np.int32)))
+
+    # Shuffle paths, not decoded images, so the first batch doesn't wait for the whole set.
+    # A cache keeps the first epoch's order; the bounded shuffle below varies it afterwards
+    if shuffle:
+        ds = ds.shuffle(len(files), seed=seed, reshuffle_each_iteration=cache_path is None)
+
+    # PIL releases the GIL while decoding and resizing, so these calls run in parallel
+    ds = ds.map(
+        lambda path, label: (tf.numpy_function(_decode, [path], tf.uint8), label),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    ds = ds.map(lambda image, label: (tf.ensure_shape(image, IMG_SIZE + (3,)), label))
+
+    # Keep the decoded 128x128 uint8 tensors (in memory, or on disk when a path is given)
+    if cache_path is not None:
+        if cache_path:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        ds = ds.cache(cache_path)
+
+        if shuffle:
+            ds = ds.shuffle(SHUFFLE_BUFFER, seed=seed, reshuffle_each_iteration=True)
+
+    ds = ds.batch(batch_size)
+    ds = ds.map(
+        lambda images, labels: (tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Reports training images/sec for every epoch."""
+
+    def __init__(self, num_images):
+        super().__init__()
+        self.num_images = num_images
+        self.history = []
+        self._train_elapsed = 0.0
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._start = time.perf_counter()
+        self._train_elapsed = None
+
+    # Validation runs inside the epoch; stop the clock before it starts
+    def on_test_begin(self, logs=None):
+        if self._train_elapsed is None:
+            self._train_elapsed = time.perf_counter() - self._start
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = self._train_elapsed or time.perf_counter() - self._start
+        images_per_sec = self.num_images / elapsed
+        self.history.append(images_per_sec)
+        if logs is not None:
+            logs["images_per_sec"] = images_per_sec
+        print(f"Epoch {epoch + 1}: {images_per_sec:.1f} images/sec ({elapsed:.1f}s)")
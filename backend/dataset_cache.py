@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+from dataset import class_files, class_names
+from preprocessing import IMG_SIZE, JPEG_DRAFT, RESAMPLE, load_image
+
+# Preprocessed dataset cache: one uint8 .npy shard of 128x128 images per class,
+# plus a manifest. Shards are memory-mapped at training time, so a retrain
+# reads pixels straight from the page cache instead of decoding every JPEG.
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def preprocessing_config():
+    return {"img_size": list(IMG_SIZE), "resample": RESAMPLE, "draft": JPEG_DRAFT}
+
+
+def shard_name(class_name):
+    return hashlib.sha1(class_name.encode()).hexdigest()[:16] + ".npy"
+
+
+# Cheap change detector: names, sizes and mtimes of a class's source files
+def stat_hash(files, root):
+    digest = hashlib.sha256()
+    for path in files:
+        stat = os.stat(path)
+        digest.update(f"{os.path.relpath(path, root)}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+# Hash of the actual bytes, used when the stat hash changed (e.g. files were copied)
+def content_hash(files, root):
+    digest = hashlib.sha256()
+    for path in files:
+        digest.update(os.path.relpath(path, root).encode() + b"\0")
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_shard(path, files, workers):
+    tmp_path = path + ".tmp"
+    if not files:
+        np.save(tmp_path, np.empty((0,) + IMG_SIZE + (3,), dtype=np.uint8))
+        os.replace(tmp_path + ".npy", path)
+        return
+
+    shard = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.uint8, shape=(len(files),) + IMG_SIZE + (3,))
+    # Decode straight into the memory-mapped rows
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(lambda item: load_image(item[1], out=shard[item[0]]), enumerate(files)))
+    shard.flush()
+    del shard
+    os.replace(tmp_path, path)
+
+
+# Create or refresh the cache; only classes whose source files changed are re-decoded
+def build_cache(dataset_path, cache_dir, workers=None):
+    os.makedirs(cache_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 4
+
+    previous = load_manifest(cache_dir)
+    if (previous is None or previous.get("version") != MANIFEST_VERSION
+            or previous.get("preprocessing") != preprocessing_config()):
+        previous = {"classes": {}}
+
+    classes = {}
+    rebuilt = []
+    for name in class_names(dataset_path):
+        files = class_files(os.path.join(dataset_path, name))
+        entry = {
+            "shard": shard_name(name),
+            "count": len(files),
+            "stat_hash": stat_hash(files, dataset_path)
+        }
+        old = previous["classes"].get(name)
+        shard_path = os.path.join(cache_dir, entry["shard"])
+
+        if old is not None and os.path.exists(shard_path) and old["stat_hash"] == entry["stat_hash"]:
+            entry["content_hash"] = old["content_hash"]
+        else:
+            entry["content_hash"] = content_hash(files, dataset_path)
+            if old is None or old["content_hash"] != entry["content_hash"] or not os.path.exists(shard_path):
+                write_shard(shard_path, files, workers)
+                rebuilt.append(name)
+        classes[name] = entry
+
+    # Remove shards of classes that no longer exist
+    for name, old in previous["classes"].items():
+        if name not in classes:
+            stale = os.path.join(cache_dir, old["shard"])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "preprocessing": preprocessing_config(),
+        "content_hash": hashlib.sha256("".join(c["content_hash"] for c in classes.values()).encode()).hexdigest(),
+        "classes": classes
+    }
+    tmp_path = os.path.join(cache_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST_NAME))
+    return manifest, rebuilt
+
+
+# Memory-mapped shards plus (shard, row) indices for each split, same split as dataset.split_dataset
+def open_cache(cache_dir, validation_split=0.2):
+    manifest = load_manifest(cache_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No dataset cache in {cache_dir}; run dataset_cache.py first")
+
+    names = sorted(manifest["classes"])
+    shards = []
+    splits = {"training": [], "validation": []}
+    for label, name in enumerate(names):
+        entry = manifest["classes"][name]
+        # Empty arrays can't be memory-mapped
+        shards.append(np.load(os.path.join(cache_dir, entry["shard"]), mmap_mode="r" if entry["count"] else None))
+        boundary = int(validation_split * entry["count"])
+        rows = np.arange(entry["count"])
+        splits["validation"].append(np.stack([np.full(boundary, label), rows[:boundary]], axis=1))
+        splits["training"].append(np.stack([np.full(entry["count"] - boundary, label), rows[boundary:]], axis=1))
+
+    splits = {subset: np.concatenate(parts) if parts else np.empty((0, 2), dtype=np.int64)
+              for subset, parts in splits.items()}
+    return names, shards, splits
+
+
+# Stream (images, one-hot labels) batches from memory-mapped shards
+def make_cached_dataset(shards, index, num_classes, batch_size, shuffle=False, seed=0):
+    epoch = [0]
+
+    def batches():
+        order = np.arange(len(index))
+        if shuffle:
+            order = np.random.default_rng(seed + epoch[0]).permutation(len(index))
+            epoch[0] += 1
+        for start in range(0, len(order), batch_size):
+            selected = index[order[start:start + batch_size]]
+            images = np.stack([shards[label][row] for label, row in selected])
+            yield images, selected[:, 0].astype(np.int32)
+
+    ds = tf.data.Dataset.from_generator(
+        batches,
+        output_signature=(
+            tf.TensorSpec(shape=(None,) + IMG_SIZE + (3,), dtype=tf.uint8),
+            tf.TensorSpec(shape=(None,), dtype=tf.int32)
+        )
+    )
+    ds = ds.map(
+        lambda images, labels: (tf.cast(images, tf.float32) / 255.0, tf.one_hot(labels, num_classes)),
+        num_parallel_calls=tf.data.AUTOTUNE
+    )
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the preprocessed dataset cache")
+    parser.add_argument("--dataset", default="dataset")
+    parser.add_argument("--cache", default="dataset_cache")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    manifest, rebuilt = build_cache(args.dataset, args.cache, args.workers)
+    total = sum(entry["count"] for entry in manifest["classes"].values())
+    print(f"{total} images in {len(manifest['classes'])} shards, rebuilt {len(rebuilt)}: {', '.join(rebuilt) or '-'}")
+    print(f"content hash {manifest['content_hash']}")
+
+
+if __name__ == "__main__":
+    main()
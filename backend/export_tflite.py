@@ -0,0 +1,98 @@
+import argparse
+import os
+
+import numpy as np
+import tensorflow as tf
+
+from dataset import make_dataset, split_dataset
+from inference import MODEL_FILES, TFLiteRunner
+
+# Same dataset layout and split as model_train.py
+DATASET_PATH = "dataset"
+VALIDATION_SPLIT = 0.2
+VARIANTS = ("dynamic", "int8", "float16")
+
+
+def dataset_subset(subset, batch_size, shuffle):
+    names, splits = split_dataset(DATASET_PATH, VALIDATION_SPLIT)
+    files, labels = splits[subset]
+    return make_dataset(files, labels, len(names), batch_size, shuffle=shuffle), len(files)
+
+
+# Calibration samples for full-integer quantization, drawn from the training split
+def representative_dataset(num_samples):
+    data, _ = dataset_subset("training", batch_size=1, shuffle=True)
+    for images, _ in data.take(num_samples):
+        yield [images.numpy()]
+
+
+def convert(model, variant, calibration_samples):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+    if variant == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        converter.representative_dataset = lambda: representative_dataset(calibration_samples)
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+    return converter.convert()
+
+
+# Compare top-1 accuracy of an exported model against the Keras model on the validation split
+def accuracy_delta(model, tflite_path, batch_size=32):
+    runner = TFLiteRunner(tflite_path)
+    data, total = dataset_subset("validation", batch_size=batch_size, shuffle=False)
+
+    keras_correct = tflite_correct = agree = 0
+    for images, labels in data.as_numpy_iterator():
+        expected = np.argmax(labels, axis=1)
+        keras_pred = np.argmax(model(images, training=False).numpy(), axis=1)
+        tflite_pred = np.argmax(runner(images), axis=1)
+        keras_correct += int(np.sum(keras_pred == expected))
+        tflite_correct += int(np.sum(tflite_pred == expected))
+        agree += int(np.sum(keras_pred == tflite_pred))
+
+    return {
+        "keras_accuracy": keras_correct / total,
+        "tflite_accuracy": tflite_correct / total,
+        "delta": (tflite_correct - keras_correct) / total,
+        "agreement": agree / total
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the trained model to TFLite")
+    parser.add_argument("--model", default=MODEL_FILES["keras"])
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--check", action="store_true", help="Report accuracy delta on the validation split")
+    parser.add_argument("--max-delta", type=float, default=0.01, help="Fail if accuracy drops by more than this")
+    args = parser.parse_args()
+
+    model = tf.keras.models.load_model(args.model, compile=False)
+    failed = []
+
+    for variant in args.variants.split(","):
+        if variant not in VARIANTS:
+            parser.error(f"Unknown variant {variant!r}, expected one of {VARIANTS}")
+
+        output_path = MODEL_FILES[variant]
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "wb") as f:
+            f.write(convert(model, variant, args.calibration_samples))
+        print(f"{variant}: wrote {output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)")
+
+        if args.check:
+            report = accuracy_delta(model, output_path)
+            print(f"{variant}: keras={report['keras_accuracy']:.4f} tflite={report['tflite_accuracy']:.4f} "
+                  f"delta={report['delta']:+.4f} agreement={report['agreement']:.4f}")
+            if -report["delta"] > args.max_delta:
+                failed.append(variant)
+
+    if failed:
+        raise SystemExit(f"Accuracy drop above {args.max_delta} for: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import threading
+
+import numpy as np
+
+# Model input shape (see model_train.py)
+IMG_SHAPE = (128, 128, 3)
+
+# Model files for each MODEL_BACKEND setting (TFLite variants come from export_tflite.py,
+# the .keras file and the SavedModel from convert_model.py)
+MODEL_FILES = {
+    "keras": "model/plant_disease_model.h5",
+    "savedmodel": "model/plant_disease_savedmodel",
+    "dynamic": "model/plant_disease_model_dynamic.tflite",
+    "int8": "model/plant_disease_model_int8.tflite",
+    "float16": "model/plant_disease_model_float16.tflite"
+}
+
+
+# TensorFlow is imported inside functions so importing this module (e.g. in a
+# pre-fork server master) doesn't start the TensorFlow runtime
+
+# Size TensorFlow's thread pools; has to run before the runtime is initialized
+def configure_threads(intra_op_threads=0, inter_op_threads=0):
+    import tensorflow as tf
+
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+
+class InferenceRunner:
+    """Compiled forward pass around a Keras model.
+
+    ``model.predict`` builds a data adapter and callbacks on every call; this
+    runner traces the model once with a fixed input signature and calls the
+    resulting graph directly. Batches are uint8 pixels; scaling to [0, 1]
+    happens inside the graph so the serving path never builds float copies.
+    """
+
+    def __init__(self, model, warmup_batch_sizes=(1,)):
+        import tensorflow as tf
+
+        self.model = model
+        self._forward = tf.function(
+            lambda images: model(tf.cast(images, tf.float32) * (1.0 / 255.0), training=False),
+            input_signature=[tf.TensorSpec(shape=(None,) + IMG_SHAPE, dtype=tf.uint8)]
+        )
+        self.warmup(warmup_batch_sizes)
+
+    @classmethod
+    def from_path(cls, model_path, warmup_batch_sizes=(1,)):
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(model_path, compile=False)
+        return cls(model, warmup_batch_sizes)
+
+    # Run dummy batches so tracing and kernel setup happen before real traffic
+    def warmup(self, batch_sizes):
+        for size in batch_sizes:
+            self(np.zeros((size,) + IMG_SHAPE, dtype=np.uint8))
+
+    def __call__(self, batch):
+        return self._forward(np.asarray(batch, dtype=np.uint8)).numpy()
+
+
+class TFLiteRunner:
+    """Runs an exported TFLite model with the same call interface as InferenceRunner.
+
+    Resizing an interpreter's input replans all of its tensor memory, so
+    batches are zero-padded to the next power of two and each of those sizes
+    keeps its own interpreter, allocated once.
+    """
+
+    def __init__(self, model_path, num_threads=None, warmup_batch_sizes=(1,)):
+        # Prefer the standalone runtime on edge boxes that don't ship full TensorFlow
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.model_path = model_path
+        self.num_threads = num_threads or None
+        self._interpreter_class = Interpreter
+        self._interpreters = {}
+        self._lock = threading.Lock()
+
+        interpreter = self._interpreter(1)[0]
+        self._input = interpreter.get_input_details()[0]
+        self._output = interpreter.get_output_details()[0]
+        self.warmup(warmup_batch_sizes)
+
+    @staticmethod
+    def padded_size(batch_size):
+        return 1 << (batch_size - 1).bit_length()
+
+    # (interpreter, input index, output index, lock) allocated for `size` images
+    def _interpreter(self, size):
+        with self._lock:
+            entry = self._interpreters.get(size)
+            if entry is None:
+                interpreter = self._interpreter_class(model_path=self.model_path, num_threads=self.num_threads)
+                input_index = interpreter.get_input_details()[0]["index"]
+                interpreter.resize_tensor_input(input_index, (size,) + IMG_SHAPE)
+                interpreter.allocate_tensors()
+                entry = (interpreter, input_index, interpreter.get_output_details()[0]["index"], threading.Lock())
+                self._interpreters[size] = entry
+            return entry
+
+    def warmup(self, batch_sizes):
+        for size in batch_sizes:
+            self(np.zeros((size,) + IMG_SHAPE, dtype=np.uint8))
+
+    # Accepts uint8 pixels (as served) or float32 already scaled to [0, 1]
+    def __call__(self, batch):
+        batch = np.asarray(batch)
+        if batch.dtype == np.uint8:
+            batch = np.multiply(batch, np.float32(1.0 / 255.0), dtype=np.float32)
+        else:
+            batch = batch.astype(np.float32, copy=False)
+
+        # Fully-quantized models take integer input
+        if self._input["dtype"] != np.float32:
+            scale, zero_point = self._input["quantization"]
+            batch = np.round(batch / scale + zero_point).astype(self._input["dtype"])
+
+        count = len(batch)
+        size = self.padded_size(count)
+        if size != count:
+            batch = np.concatenate([batch, np.zeros((size - count,) + batch.shape[1:], dtype=batch.dtype)])
+
+        interpreter, input_index, output_index, lock = self._interpreter(size)
+        with lock:
+            interpreter.set_tensor(input_index, batch)
+            interpreter.invoke()
+            output = interpreter.get_tensor(output_index)[:count]
+
+        if self._output["dtype"] != np.float32:
+            scale, zero_point = self._output["quantization"]
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+class SavedModelRunner:
+    """Calls the ``serve`` endpoint of a SavedModel written by convert_model.py.
+
+    The endpoint is an already-traced graph taking uint8 pixels, so loading it
+    skips Keras model deserialization and tracing entirely.
+    """
+
+    def __init__(self, model_path, warmup_batch_sizes=(1,)):
+        import tensorflow as tf
+
+        self._serve = tf.saved_model.load(model_path).serve
+        self.warmup(warmup_batch_sizes)
+
+    def warmup(self, batch_sizes):
+        for size in batch_sizes:
+            self(np.zeros((size,) + IMG_SHAPE, dtype=np.uint8))
+
+    def __call__(self, batch):
+        return self._serve(np.asarray(batch, dtype=np.uint8)).numpy()
+
+
+# Modification time of a model file, or of a SavedModel's graph file
+def model_mtime(path):
+    if os.path.isdir(path):
+        path = os.path.join(path, "saved_model.pb")
+    return os.stat(path).st_mtime_ns
+
+
+# Pick the backend and model path. "auto" (and "keras" without a path) serves the
+# newest of the trained .h5 and its converted copies, so a retrain isn't shadowed
+# by a stale conversion; on equal times the faster format to load wins
+def resolve_model(backend="auto", model_path=None):
+    if backend == "auto" and model_path:
+        backend = "keras"
+
+    if backend in ("auto", "keras") and not model_path:
+        candidates = [
+            ("savedmodel", MODEL_FILES["savedmodel"]),
+            ("keras", os.path.splitext(MODEL_FILES["keras"])[0] + ".keras"),
+            ("keras", MODEL_FILES["keras"])
+        ]
+        if backend == "keras":
+            candidates = candidates[1:]
+
+        newest = None
+        for candidate in candidates:
+            try:
+                mtime = model_mtime(candidate[1])
+            except OSError:
+                continue
+            if newest is None or mtime > newest[0]:
+                newest = (mtime, candidate)
+        backend, model_path = newest[1] if newest else ("keras", MODEL_FILES["keras"])
+
+    if backend not in MODEL_FILES:
+        raise ValueError(f"Unknown MODEL_BACKEND {backend!r}, expected auto or one of {sorted(MODEL_FILES)}")
+    return backend, model_path or MODEL_FILES[backend]
+
+
+# Build the runner for a MODEL_BACKEND setting. `num_threads` sizes TensorFlow's
+# intra-op pool or the TFLite interpreter; TFLite backends never import TensorFlow
+# when tflite_runtime is installed
+def load_runner(backend="keras", model_path=None, num_threads=0, inter_op_threads=0, warmup_batch_sizes=(1,)):
+    if backend not in MODEL_FILES:
+        raise ValueError(f"Unknown MODEL_BACKEND {backend!r}, expected one of {sorted(MODEL_FILES)}")
+
+    model_path = model_path or MODEL_FILES[backend]
+    if backend in ("keras", "savedmodel"):
+        configure_threads(num_threads, inter_op_threads)
+    if backend == "keras":
+        return InferenceRunner.from_path(model_path, warmup_batch_sizes)
+    if backend == "savedmodel":
+        return SavedModelRunner(model_path, warmup_batch_sizes)
+    return TFLiteRunner(model_path, num_threads=num_threads, warmup_batch_sizes=warmup_batch_sizes)
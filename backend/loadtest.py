@@ -0,0 +1,129 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import numpy as np
+
+
+def sample_image():
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 256, (1024, 1024, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def multipart_body(img_bytes, filename="leaf.jpg"):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + img_bytes + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def post(url, body, content_type, timeout=60):
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def wait_until_serving(url, body, content_type, timeout=300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if post(url, body, content_type)[0] == 200:
+                return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not come up within {timeout}s")
+
+
+# Hammer the endpoint from `concurrency` client threads for `duration` seconds
+def run_load(url, body, content_type, concurrency, duration):
+    latencies, errors = [], [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client():
+        while time.monotonic() < stop_at:
+            start = time.perf_counter()
+            try:
+                status, _ = post(url, body, content_type)
+                ok = status == 200
+            except (urllib.error.URLError, ConnectionError):
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if not latencies:
+        return {"throughput": 0.0, "p50_ms": float("nan"), "p99_ms": float("nan"), "errors": errors[0]}
+    return {
+        "throughput": len(latencies) / duration,
+        "p50_ms": float(np.percentile(latencies, 50) * 1000),
+        "p99_ms": float(np.percentile(latencies, 99) * 1000),
+        "errors": errors[0]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure /predict throughput as the number of workers grows")
+    parser.add_argument("--image", help="Image to upload (default: a generated 1024x1024 JPEG)")
+    parser.add_argument("--workers", default="1,2,4", help="Worker counts to start serve.py with")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--url", help="Load-test an already running server instead of starting serve.py")
+    args = parser.parse_args()
+
+    img_bytes = open(args.image, "rb").read() if args.image else sample_image()
+    # Every request uploads the same image, so the spawned servers run without a result cache
+    env = dict(os.environ, CACHE_MAX_ENTRIES="0")
+    body, content_type = multipart_body(img_bytes)
+
+    if args.url:
+        result = run_load(args.url, body, content_type, args.concurrency, args.duration)
+        print(f"{result['throughput']:.1f} req/s  p50={result['p50_ms']:.1f}ms  "
+              f"p99={result['p99_ms']:.1f}ms  errors={result['errors']}")
+        return
+
+    url = f"http://127.0.0.1:{args.port}/predict"
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for workers in [int(count) for count in args.workers.split(",")]:
+        server = subprocess.Popen(
+            [sys.executable, "serve.py", "--bind", f"127.0.0.1:{args.port}", "--workers", str(workers), "--pin-cpus"],
+            env=env
+        )
+        try:
+            wait_until_serving(url, body, content_type)
+            result = run_load(url, body, content_type, args.concurrency, args.duration)
+        finally:
+            server.terminate()
+            server.wait()
+        print(f"{workers:>7} {result['throughput']:>9.1f} {result['p50_ms']:>9.1f} "
+              f"{result['p99_ms']:>9.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,283 @@
-import tensorflow as tf
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+import argparse
 import json
 import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+from dataset import ThroughputCallback, make_dataset, split_dataset
+from dataset_cache import build_cache, make_cached_dataset, open_cache
+from inference import configure_threads
+from postprocess import fit_temperature
 
 # Define dataset path
 DATASET_PATH = "dataset"
 
-# Image size and batch size
-IMG_SIZE = (128, 128)
+# Defaults (image size and resampling filter are shared with app.py via preprocessing.py)
 BATCH_SIZE = 32
+EPOCHS = 6
+LEARNING_RATE = 0.001
+VALIDATION_SPLIT = 0.2
+
+# Preprocessed shard cache (see dataset_cache.py); set SHARD_CACHE="" to decode JPEGs every run
+SHARD_CACHE = os.environ.get("SHARD_CACHE", "dataset_cache")
+
+# Optional tf.data cache when decoding JPEGs: "" keeps them in memory, a path caches on disk
+DATASET_CACHE = os.environ.get("DATASET_CACHE")
+
+MODEL_PATH = "model/plant_disease_model.h5"
+CALIBRATION_PATH = "model/calibration.json"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train the plant disease CNN")
+    parser.add_argument("--epochs", type=int, default=EPOCHS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Per-replica batch size")
+    parser.add_argument("--learning-rate", type=float, default=LEARNING_RATE)
+    parser.add_argument("--scale-lr", action="store_true",
+                        help=f"Scale the learning rate linearly with global batch size / {BATCH_SIZE}")
+    parser.add_argument("--strategy", choices=("default", "mirrored", "multiworker"), default="default",
+                        help="multiworker reads the cluster from TF_CONFIG")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="Start this many multiworker processes on this machine")
+    parser.add_argument("--mixed-precision", choices=("none", "bfloat16", "float16"), default="none")
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--checkpoint-dir", default="checkpoints",
+                        help="Training state for resuming an interrupted run (removed when training completes)")
+    parser.add_argument("--report", default="model/training_report.json")
+    parser.add_argument("--no-cache-refresh", action="store_true", help="Use the shard cache without updating it")
+    parser.add_argument("--calibrate", action="store_true",
+                        help=f"Fit a softmax temperature on the validation split and store it in {CALIBRATION_PATH} "
+                             "(otherwise the temperature there is reset to 1)")
+    return parser.parse_args(argv)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+# Run `count` multiworker processes on this machine, each with its share of the cores
+def launch_local_workers(count, argv):
+    if SHARD_CACHE:
+        build_cache(DATASET_PATH, SHARD_CACHE)
+
+    cluster = {"worker": [f"localhost:{free_port()}" for _ in range(count)]}
+    cores = os.cpu_count() or count
+    threads = str(max(1, cores // count))
+
+    # Same arguments, minus --local-workers
+    worker_argv = []
+    remaining = iter(argv)
+    for arg in remaining:
+        if arg == "--local-workers":
+            next(remaining, None)
+        elif not arg.startswith("--local-workers="):
+            worker_argv.append(arg)
+    worker_argv += ["--strategy", "multiworker", "--no-cache-refresh"]
+    if not any(arg.startswith("--intra-op-threads") for arg in argv):
+        worker_argv += ["--intra-op-threads", threads]
+
+    workers = []
+    for index in range(count):
+        env = dict(os.environ, TF_CONFIG=json.dumps({"cluster": cluster, "task": {"type": "worker", "index": index}}))
+        # An on-disk tf.data cache can't be written by several processes at once
+        if DATASET_CACHE:
+            env["DATASET_CACHE"] = os.path.join(DATASET_CACHE, f"worker{index}")
+        workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__), *worker_argv], env=env))
+
+    return max(worker.wait() for worker in workers)
+
+
+def make_strategy(name):
+    if name == "mirrored":
+        return tf.distribute.MirroredStrategy()
+    if name == "multiworker":
+        return tf.distribute.MultiWorkerMirroredStrategy()
+    return tf.distribute.get_strategy()
+
+
+# The "chief" task if the cluster has one, otherwise worker 0 (or a process without TF_CONFIG)
+def is_chief():
+    tf_config = json.loads(os.environ.get("TF_CONFIG", "{}"))
+    task = tf_config.get("task", {})
+    if "chief" in tf_config.get("cluster", {}):
+        return task.get("type") == "chief"
+    return task.get("type", "worker") == "worker" and task.get("index", 0) == 0
+
+
+def load_datasets(batch_size, refresh_cache):
+    # Load dataset (same per-class split as ImageDataGenerator(validation_split=0.2))
+    if SHARD_CACHE:
+        # Only classes whose source images changed since the last run are re-decoded
+        if refresh_cache:
+            manifest, rebuilt = build_cache(DATASET_PATH, SHARD_CACHE)
+            print(f"Dataset cache {manifest['content_hash'][:12]}: "
+                  f"rebuilt {len(rebuilt)} of {len(manifest['classes'])} shards.")
+        class_names, shards, index = open_cache(SHARD_CACHE, VALIDATION_SPLIT)
+        num_train, num_val = len(index["training"]), len(index["validation"])
+        train_data = make_cached_dataset(shards, index["training"], len(class_names), batch_size, shuffle=True)
+        val_data = make_cached_dataset(shards, index["validation"], len(class_names), batch_size)
+    else:
+        class_names, splits = split_dataset(DATASET_PATH, VALIDATION_SPLIT)
+        train_files, train_labels = splits["training"]
+        val_files, val_labels = splits["validation"]
+        num_train, num_val = len(train_files), len(val_files)
+
+        train_data = make_dataset(
+            train_files,
+            train_labels,
+            len(class_names),
+            batch_size,
+            shuffle=True,
+            cache_path=DATASET_CACHE and os.path.join(DATASET_CACHE, "train")
+        )
+
+        val_data = make_dataset(
+            val_files,
+            val_labels,
+            len(class_names),
+            batch_size,
+            cache_path=DATASET_CACHE and os.path.join(DATASET_CACHE, "validation")
+        )
+
+    # Batches come from one generator, so workers split them by element rather than by file
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    train_data = train_data.with_options(options)
+    val_data = val_data.with_options(options)
+
+    print(f"Found {num_train} training and {num_val} validation images in {len(class_names)} classes.")
+    return class_names, train_data, val_data, num_train
+
+
+# Fit the serving temperature on the validation split
+def calibrate(model, val_data):
+    scores, labels = [], []
+    for images, one_hot in val_data:
+        scores.append(model(images, training=False).numpy())
+        labels.append(np.argmax(one_hot.numpy(), axis=1))
+    return fit_temperature(np.concatenate(scores), np.concatenate(labels))
+
+
+# Store the temperature for the model just trained, keeping any per-class thresholds
+# already configured; a temperature fit for a previous model must not carry over
+def write_temperature(temperature):
+    config = {}
+    if os.path.exists(CALIBRATION_PATH):
+        with open(CALIBRATION_PATH) as f:
+            config = json.load(f)
+    config["temperature"] = round(temperature, 4)
+    with open(CALIBRATION_PATH, "w") as f:
+        json.dump(config, f, indent=2)
+    print(f"Calibration: temperature {temperature:.3f} written to {CALIBRATION_PATH}")
 
-# Data Augmentation and Preprocessing
-datagen = ImageDataGenerator(
-    rescale=1.0 / 255.0,
-    validation_split=0.2  
-)
-
-# Load dataset
-train_data = datagen.flow_from_directory(
-    DATASET_PATH,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="training"
-)
-
-val_data = datagen.flow_from_directory(
-    DATASET_PATH,
-    target_size=IMG_SIZE,
-    batch_size=BATCH_SIZE,
-    class_mode="categorical",
-    subset="validation"
-)
-
-# Get class indices and save them
-class_indices = train_data.class_indices
-class_labels = {v: k for k, v in class_indices.items()}
-
-# Save class indices as JSON
-os.makedirs("model", exist_ok=True)
-with open("model/class_indices.json", "w") as f:
-    json.dump(class_labels, f)
 
 # Define CNN Model
-model = tf.keras.models.Sequential([
-    tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(128, 128, 3)),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Conv2D(128, (3, 3), activation='relu'),
-    tf.keras.layers.MaxPooling2D(2, 2),
-    tf.keras.layers.Flatten(),
-    tf.keras.layers.Dense(128, activation='relu'),
-    tf.keras.layers.Dropout(0.5),
-    tf.keras.layers.Dense(len(class_labels), activation='softmax')  
-])
-
-# Compile the model
-model.compile(
-    optimizer="adam",
-    loss="categorical_crossentropy",
-    metrics=["accuracy"]
-)
-
-# Train the model
-model.fit(
-    train_data,
-    validation_data=val_data,
-    epochs=6 # Change based on your requirements
-)
-
-# Save trained model
-model.save("model/plant_disease_model.h5")
-
-print("Model training complete and saved!")
+def build_model(num_classes):
+    return tf.keras.models.Sequential([
+        tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(128, 128, 3)),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Conv2D(128, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D(2, 2),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(128, activation='relu'),
+        tf.keras.layers.Dropout(0.5),
+        # Softmax stays in float32 under mixed precision
+        tf.keras.layers.Dense(num_classes, activation='softmax', dtype='float32')
+    ])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = parse_args(argv)
+
+    if args.local_workers:
+        sys.exit(launch_local_workers(args.local_workers, argv))
+
+    # Thread pools and precision policy must be set before any op runs
+    configure_threads(args.intra_op_threads, args.inter_op_threads)
+    if args.mixed_precision != "none":
+        tf.keras.mixed_precision.set_global_policy(f"mixed_{args.mixed_precision}")
+
+    strategy = make_strategy(args.strategy)
+    replicas = strategy.num_replicas_in_sync
+    global_batch_size = args.batch_size * replicas
+    learning_rate = args.learning_rate
+    if args.scale_lr:
+        learning_rate *= global_batch_size / BATCH_SIZE
+    chief = is_chief()
+
+    class_names, train_data, val_data, num_train = load_datasets(global_batch_size, not args.no_cache_refresh)
+
+    # Get class indices and save them
+    class_labels = dict(enumerate(class_names))
+
+    # Save class indices as JSON
+    if chief:
+        os.makedirs("model", exist_ok=True)
+        with open("model/class_indices.json", "w") as f:
+            json.dump(class_labels, f)
+
+    with strategy.scope():
+        model = build_model(len(class_labels))
+
+        # Compile the model
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate),
+            loss="categorical_crossentropy",
+            metrics=["accuracy"]
+        )
+
+    # Train the model; an interrupted run resumes from the last completed epoch
+    throughput = ThroughputCallback(num_train)
+    start = time.perf_counter()
+    history = model.fit(
+        train_data,
+        validation_data=val_data,
+        epochs=args.epochs,
+        callbacks=[throughput, tf.keras.callbacks.BackupAndRestore(args.checkpoint_dir)]
+    )
+    elapsed = time.perf_counter() - start
+
+    # Save trained model (every worker must save; only the chief writes the real file)
+    save_path = MODEL_PATH if chief else os.path.join(tempfile.mkdtemp(), os.path.basename(MODEL_PATH))
+    model.save(save_path)
+
+    if chief:
+        temperature = calibrate(model, val_data) if args.calibrate else 1.0
+        write_temperature(temperature)
+        report = {
+            "strategy": args.strategy,
+            "replicas": replicas,
+            "batch_size_per_replica": args.batch_size,
+            "global_batch_size": global_batch_size,
+            "learning_rate": learning_rate,
+            "mixed_precision": args.mixed_precision,
+            "intra_op_threads": args.intra_op_threads,
+            "inter_op_threads": args.inter_op_threads,
+            "epochs_run": len(throughput.history),
+            "images_per_sec": throughput.history,
+            "mean_images_per_sec": sum(throughput.history) / len(throughput.history) if throughput.history else 0.0,
+            "train_seconds": elapsed,
+            "final_val_accuracy": history.history.get("val_accuracy", [None])[-1],
+            "temperature": temperature
+        }
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Throughput: {report['mean_images_per_sec']:.1f} images/sec over {report['epochs_run']} epochs "
+              f"({replicas} replicas, global batch {global_batch_size}); report written to {args.report}")
+
+    print("Model training complete and saved!")
+
+
+if __name__ == "__main__":
+    main()
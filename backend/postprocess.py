@@ -0,0 +1,91 @@
+import json
+import os
+
+import numpy as np
+
+# Confidence (percent) below which a prediction is reported as "unknown"
+DEFAULT_THRESHOLD = 70.0
+
+
+# Rescale softmax outputs as if the logits were divided by `temperature`
+def apply_temperature(scores, temperature):
+    if temperature == 1.0:
+        return scores
+    logits = np.log(np.clip(scores, 1e-12, 1.0)) / temperature
+    logits -= logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+# Indices and scores of the k best classes per row, best first; only the k
+# partitioned entries are sorted
+def top_k(scores, k):
+    k = min(k, scores.shape[1])
+    if k == scores.shape[1]:
+        indices = np.argsort(-scores, axis=1)
+    else:
+        indices = np.argpartition(scores, -k, axis=1)[:, -k:]
+        order = np.argsort(-np.take_along_axis(scores, indices, axis=1), axis=1)
+        indices = np.take_along_axis(indices, order, axis=1)
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+
+# Temperature minimizing the negative log-likelihood of `labels` (golden-section search over log T)
+def fit_temperature(scores, labels, low=0.05, high=10.0, iterations=40):
+    scores = np.asarray(scores, dtype=np.float64)
+    rows = np.arange(len(labels))
+
+    def nll(log_t):
+        calibrated = apply_temperature(scores, float(np.exp(log_t)))
+        return -np.mean(np.log(np.clip(calibrated[rows, labels], 1e-12, 1.0)))
+
+    a, b = np.log(low), np.log(high)
+    ratio = (np.sqrt(5) - 1) / 2
+    c, d = b - ratio * (b - a), a + ratio * (b - a)
+    for _ in range(iterations):
+        if nll(c) < nll(d):
+            b, d = d, c
+            c = b - ratio * (b - a)
+        else:
+            a, c = c, d
+            d = a + ratio * (b - a)
+    return float(np.exp((a + b) / 2))
+
+
+class Calibration:
+    """Temperature and per-class confidence thresholds applied to whole batches of model output."""
+
+    def __init__(self, labels, temperature=1.0, default_threshold=DEFAULT_THRESHOLD, thresholds=None):
+        self.temperature = float(temperature)
+        self.thresholds = np.full(len(labels), float(default_threshold))
+        for label, threshold in (thresholds or {}).items():
+            self.thresholds[labels.index(label)] = float(threshold)
+
+    # A missing file means no calibration: temperature 1 and the default threshold for every class
+    @classmethod
+    def load(cls, path, labels, warnings):
+        if not os.path.exists(path):
+            return cls(labels)
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+
+        thresholds = {}
+        for label, threshold in config.get("thresholds", {}).items():
+            if label in labels:
+                thresholds[label] = threshold
+            else:
+                warnings.append(f"{os.path.basename(path)}: threshold for {label!r}, which is not a model class")
+        temperature = config.get("temperature", 1.0)
+        if not temperature > 0:
+            raise ValueError(f"{path}: temperature must be positive")
+        return cls(labels, temperature, config.get("default_threshold", DEFAULT_THRESHOLD), thresholds)
+
+    # For an (n, classes) score matrix: the top k class indices and confidences
+    # (percent, rounded to 2 places) per row, and whether the best class falls
+    # below its threshold
+    def postprocess(self, scores, k=1):
+        scores = apply_temperature(np.asarray(scores, dtype=np.float64).reshape(len(scores), -1), self.temperature)
+        indices, best = top_k(scores, k)
+        confidences = np.round(100 * best, 2)
+        below_threshold = confidences[:, 0] < self.thresholds[indices[:, 0]]
+        return indices, confidences, below_threshold
@@ -0,0 +1,81 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+# Shared by app.py and model_train.py so training and serving see the same pixels
+IMG_SIZE = (128, 128)
+RESAMPLE = os.environ.get("RESAMPLE", "bilinear")
+JPEG_DRAFT = os.environ.get("JPEG_DRAFT", "1") == "1"
+
+# Upload limits, checked before any pixel data is decoded
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 20 * 1024 * 1024))
+MAX_PIXELS = int(os.environ.get("MAX_PIXELS", 40_000_000))
+
+RESAMPLE_FILTERS = {
+    "nearest": Image.NEAREST,
+    "box": Image.BOX,
+    "bilinear": Image.BILINEAR,
+    "hamming": Image.HAMMING,
+    "bicubic": Image.BICUBIC,
+    "lanczos": Image.LANCZOS
+}
+
+
+class ImageRejectedError(ValueError):
+    """Raised when an upload exceeds the configured size or pixel limits."""
+
+
+# Decode an image (bytes or path) straight to a size x size RGB image
+def decode_image(source, size=IMG_SIZE, resample=RESAMPLE, draft=JPEG_DRAFT):
+    return resize_image(open_image(source, size, draft), size, resample)
+
+
+# Decode to RGB, at reduced resolution when the format supports it
+def open_image(source, size=IMG_SIZE, draft=JPEG_DRAFT):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if len(source) > MAX_UPLOAD_BYTES:
+            raise ImageRejectedError(f"Upload is {len(source)} bytes, limit is {MAX_UPLOAD_BYTES}")
+        source = io.BytesIO(source)
+
+    img = Image.open(source)
+
+    # Only the header has been read so far
+    width, height = img.size
+    if width * height > MAX_PIXELS:
+        img.close()
+        raise ImageRejectedError(f"Image is {width}x{height} pixels, limit is {MAX_PIXELS}")
+
+    # Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while decoding
+    if draft:
+        img.draft("RGB", size)
+
+    # Loading also closes the file when a path was given
+    img.load()
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return img
+
+
+def resize_image(img, size=IMG_SIZE, resample=RESAMPLE):
+    return img.resize(size, RESAMPLE_FILTERS[resample])
+
+
+# Convert a decoded image to an array; float32 output is scaled to [0, 1]
+def to_array(img, dtype=np.uint8, out=None):
+    pixels = np.asarray(img, dtype=np.uint8)
+    if np.dtype(dtype) == np.uint8:
+        if out is None:
+            return pixels
+        out[...] = pixels
+        return out
+
+    if out is None:
+        out = np.empty(pixels.shape, dtype=dtype)
+    np.multiply(pixels, np.float32(1.0 / 255.0), out=out)
+    return out
+
+
+def load_image(source, dtype=np.uint8, out=None, size=IMG_SIZE, resample=RESAMPLE, draft=JPEG_DRAFT):
+    return to_array(decode_image(source, size, resample, draft), dtype, out)
@@ -0,0 +1,48 @@
+import sys
+import threading
+import time
+from collections import Counter
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads and aggregates them in collapsed-stack format.
+
+    The output (one ``frame;frame;frame count`` line per distinct stack) can be
+    fed to flamegraph.pl or speedscope.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.samples = Counter()
+        self._lock = threading.Lock()
+
+    # Only one profile runs at a time; sampling every thread isn't free
+    def run(self, seconds, interval=None):
+        if not self._lock.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            if interval is not None:
+                self.interval = interval
+            self.samples = Counter()
+            own_id = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id != own_id:
+                        self.samples[self._collapse(frame)] += 1
+                time.sleep(self.interval)
+            return self.collapsed()
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
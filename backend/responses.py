@@ -0,0 +1,188 @@
+import json
+import os
+import threading
+import time
+
+from postprocess import Calibration
+
+# Response fields in the order they are served, with the fallback text used when
+# a class has no entry in the disease table
+INFO_FIELDS = {
+    "cause": "No information available.",
+    "problem": "No information available.",
+    "solution": "No solution available.",
+    "care": "No care information available.",
+    "prevention": "No prevention information available."
+}
+UNKNOWN_LABEL = "unknown"
+
+
+class ResponseTableError(ValueError):
+    pass
+
+
+def _load_json_checked(path, warnings):
+    # json.load silently keeps the last of repeated keys; record them instead
+    def pairs_hook(pairs):
+        seen = set()
+        for key, _ in pairs:
+            if key in seen:
+                warnings.append(f"{os.path.basename(path)}: duplicate key {key!r}, the last one is used")
+            seen.add(key)
+        return dict(pairs)
+
+    with open(path, encoding="utf-8") as f:
+        return json.load(f, object_pairs_hook=pairs_hook)
+
+
+class ResponseTable:
+    """Prediction responses pre-serialized per model output index.
+
+    Each entry is split around the confidence value, so serving a prediction
+    is one list index plus string concatenation. The optional calibration file
+    holds the temperature and per-class thresholds (see postprocess.py).
+    """
+
+    def __init__(self, labels_path, info_path, calibration_path=None):
+        self.labels_path = labels_path
+        self.info_path = info_path
+        self.warnings = []
+
+        class_labels = _load_json_checked(labels_path, self.warnings)
+        info = _load_json_checked(info_path, self.warnings)
+        if not isinstance(class_labels, dict):
+            raise ResponseTableError(f"{labels_path}: expected an object of index -> class name")
+        if not isinstance(info, dict):
+            raise ResponseTableError(f"{info_path}: expected an object")
+        self.version = info.get("version")
+        diseases = info.get("diseases")
+        if not isinstance(diseases, dict) or not all(isinstance(entry, dict) for entry in diseases.values()):
+            raise ResponseTableError(f"{info_path}: expected a 'diseases' object of objects")
+
+        # Keys must be exactly "0".."n-1" ("01" or " 1" would not match the model outputs)
+        expected = [str(index) for index in range(len(class_labels))]
+        if sorted(class_labels, key=lambda key: (len(key), key)) != expected:
+            raise ResponseTableError(f"{labels_path}: class indices must be 0..{len(class_labels) - 1}")
+        self.labels = [class_labels[index] for index in expected]
+        if not all(isinstance(label, str) for label in self.labels):
+            raise ResponseTableError(f"{labels_path}: class names must be strings")
+
+        unknown = diseases.get(UNKNOWN_LABEL)
+        if unknown is None:
+            raise ResponseTableError(f"{info_path}: missing the {UNKNOWN_LABEL!r} entry")
+
+        for label in diseases:
+            if label != UNKNOWN_LABEL and label not in self.labels:
+                self.warnings.append(f"{os.path.basename(info_path)}: {label!r} is not a model class")
+
+        self.unknown_index = self.labels.index(UNKNOWN_LABEL) if UNKNOWN_LABEL in self.labels else -1
+        self.fragments = []
+        for label in self.labels:
+            if label not in diseases:
+                self.warnings.append(f"{os.path.basename(info_path)}: no entry for model class {label!r}")
+            self.fragments.append(self._compile(label, diseases.get(label, {})))
+        self.unknown_fragment = self._compile("Unknown", unknown)
+        self.label_json = [json.dumps(label) for label in self.labels]
+
+        if calibration_path:
+            self.calibration = Calibration.load(calibration_path, self.labels, self.warnings)
+        else:
+            self.calibration = Calibration(self.labels)
+
+    def _compile(self, label, entry):
+        for field in entry:
+            if field not in INFO_FIELDS:
+                self.warnings.append(f"{os.path.basename(self.info_path)}: unexpected field {field!r} for {label!r}")
+        head = '{"class": ' + json.dumps(label) + ', "confidence": '
+        tail = "".join(
+            f", {json.dumps(field)}: {json.dumps(entry.get(field, default))}"
+            for field, default in INFO_FIELDS.items()
+        ) + "}"
+        return head, tail
+
+    def is_unknown(self, class_index):
+        return class_index == self.unknown_index
+
+    # JSON body for a prediction; `confidence` is the rounded percentage
+    def render(self, class_index, confidence, unknown=False):
+        if unknown or class_index == self.unknown_index:
+            head, tail = self.unknown_fragment
+        else:
+            head, tail = self.fragments[class_index]
+        return head + repr(float(confidence)) + tail
+
+    # (JSON body, unknown) for each row of an (n, classes) score matrix; with
+    # top_k the k best classes are appended as a "top_k" list
+    def render_batch(self, scores, top_k=0):
+        indices, confidences, below_threshold = self.calibration.postprocess(scores, max(top_k, 1))
+        unknown = below_threshold | (indices[:, 0] == self.unknown_index)
+
+        rendered = []
+        for row_indices, row_confidences, row_unknown in zip(indices.tolist(), confidences.tolist(), unknown.tolist()):
+            body = self.render(row_indices[0], row_confidences[0], row_unknown)
+            if top_k:
+                candidates = ", ".join(
+                    '{"class": ' + self.label_json[index] + ', "confidence": ' + repr(confidence) + "}"
+                    for index, confidence in zip(row_indices, row_confidences)
+                )
+                body = body[:-1] + ', "top_k": [' + candidates + "]}"
+            rendered.append((body, row_unknown))
+        return rendered
+
+
+class ReloadingResponseTable:
+    """Serves a ResponseTable and rebuilds it when either source file changes.
+
+    A reload that fails validation keeps serving the previous table.
+    """
+
+    def __init__(self, labels_path, info_path, calibration_path=None, check_interval=2.0, logger=None):
+        self.labels_path = labels_path
+        self.info_path = info_path
+        self.calibration_path = calibration_path
+        self.check_interval = check_interval
+        self.logger = logger
+        self.table = ResponseTable(labels_path, info_path, calibration_path)
+        self._mtimes = self._stat()
+        self._failed_mtimes = None
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._log_warnings()
+
+    # The calibration file is optional, so its absence is part of the state
+    def _stat(self):
+        mtimes = [os.stat(path).st_mtime_ns for path in (self.labels_path, self.info_path)]
+        if self.calibration_path:
+            mtimes.append(os.stat(self.calibration_path).st_mtime_ns if os.path.exists(self.calibration_path) else None)
+        return tuple(mtimes)
+
+    def _log_warnings(self):
+        if self.logger is not None:
+            for warning in self.table.warnings:
+                self.logger.warning(warning)
+
+    def _log_reload_error(self, error):
+        if self.logger is not None:
+            self.logger.error("Keeping previous response table, reload failed: %s", error)
+
+    def current(self):
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval and self._lock.acquire(blocking=False):
+            try:
+                self._checked_at = now
+                mtimes = self._stat()
+                # A version that fails to build is reported once, then skipped until the files change again
+                if mtimes != self._mtimes and mtimes != self._failed_mtimes:
+                    try:
+                        self.table = ResponseTable(self.labels_path, self.info_path, self.calibration_path)
+                    except Exception as e:
+                        self._failed_mtimes = mtimes
+                        self._log_reload_error(e)
+                    else:
+                        self._mtimes = mtimes
+                        self._log_warnings()
+            except OSError as e:
+                self._log_reload_error(e)
+            finally:
+                self._lock.release()
+        return self.table
@@ -0,0 +1,96 @@
+import argparse
+import itertools
+import os
+
+from gunicorn.app.base import BaseApplication
+
+
+class ServeApplication(BaseApplication):
+    """Runs app.py under gunicorn with per-worker model loading and thread sizing."""
+
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        from app import app
+        return app
+
+
+# Runs in the master before each fork: a worker (including one replacing a dead or
+# recycled worker) takes the lowest core slot no live worker holds
+def assign_slot(server, worker):
+    taken = {getattr(live, "cpu_slot", None) for live in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in itertools.count() if slot not in taken)
+
+
+# Give each worker its own slice of cores so workers don't compete for them
+def pin_worker(server, worker):
+    cores = sorted(os.sched_getaffinity(0))
+    workers = server.cfg.workers
+    slot = worker.cpu_slot % workers
+    per_worker = max(1, len(cores) // workers)
+    selected = cores[slot * per_worker:(slot + 1) * per_worker] or cores
+    os.sched_setaffinity(0, selected)
+
+
+# Load and warm the model in the background; the worker answers /healthz meanwhile
+# and /readyz turns 200 once the model is ready
+def load_model(worker):
+    import app
+    app.start_model_loading()
+
+
+# Finish requests already queued in the batcher before the worker exits
+def drain(server, worker):
+    import app
+    app.shutdown(timeout=server.cfg.graceful_timeout)
+
+
+def main():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+    parser = argparse.ArgumentParser(description="Production server for the plant disease API")
+    parser.add_argument("--bind", default="0.0.0.0:5000")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own model")
+    parser.add_argument("--threads", type=int, default=8, help="Request threads per worker sharing one model")
+    parser.add_argument("--intra-op-threads", type=int, default=0, help="Default: cores / workers")
+    parser.add_argument("--inter-op-threads", type=int, default=1)
+    parser.add_argument("--pin-cpus", action="store_true", help="Bind each worker to its own set of cores")
+    parser.add_argument("--no-preload", action="store_true", help="Import the app in each worker instead of the master")
+    parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    args = parser.parse_args()
+
+    # Read by app.py at import, so set before the master preloads it
+    intra_op_threads = args.intra_op_threads or max(1, cores // args.workers)
+    os.environ.setdefault("INTRA_OP_THREADS", str(intra_op_threads))
+    os.environ.setdefault("INTER_OP_THREADS", str(args.inter_op_threads))
+    os.environ.setdefault("OMP_NUM_THREADS", str(intra_op_threads))
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "threads": args.threads,
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        # Preloading imports Flask, numpy and the app tables once in the master;
+        # TensorFlow itself is only initialized in the workers (see start_model_loading)
+        "preload_app": not args.no_preload,
+        "post_worker_init": load_model,
+        "worker_exit": drain
+    }
+    if args.pin_cpus:
+        options["pre_fork"] = assign_slot
+        options["post_fork"] = pin_worker
+
+    ServeApplication(options).run()
+
+
+if __name__ == "__main__":
+    main()
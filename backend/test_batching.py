@@ -0,0 +1,69 @@
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+from batching import MicroBatcher, QueueFullError
+
+
+def test_batcher_stacks_items_and_returns_rows():
+    calls = []
+
+    def predict(batch):
+        calls.append(batch.shape)
+        return batch.sum(axis=1)
+
+    batcher = MicroBatcher(predict)
+    live = [(np.full(3, i), Future()) for i in range(4)]
+    batcher._process(live)
+
+    assert calls == [(4, 3)]
+    assert [future.result() for _, future in live] == [0, 3, 6, 9]
+
+
+def test_batcher_skips_cancelled_futures():
+    calls = []
+    batcher = MicroBatcher(lambda batch: calls.append(len(batch)) or batch)
+    cancelled, kept = Future(), Future()
+    cancelled.cancel()
+    batcher._process([(np.zeros(2), cancelled), (np.ones(2), kept)])
+
+    assert calls == [1]
+    assert kept.result().tolist() == [1, 1]
+
+
+def test_batcher_propagates_errors_to_every_caller():
+    def predict(batch):
+        raise RuntimeError("boom")
+
+    batcher = MicroBatcher(predict)
+    futures = [Future(), Future()]
+    batcher._process([(np.zeros(1), future) for future in futures])
+
+    for future in futures:
+        with pytest.raises(RuntimeError, match="boom"):
+            future.result()
+
+
+def test_batcher_rejects_work_when_queue_is_full():
+    started, release = threading.Event(), threading.Event()
+
+    def predict(batch):
+        started.set()
+        release.wait(5)
+        return batch
+
+    batcher = MicroBatcher(predict, max_batch_size=1, max_wait_ms=0, max_queue_size=1)
+    try:
+        first = batcher.submit(np.zeros(1))
+        assert started.wait(5)
+        second = batcher.submit(np.zeros(1))
+        with pytest.raises(QueueFullError):
+            batcher.submit(np.zeros(1))
+    finally:
+        release.set()
+        batcher.stop(timeout=5)
+
+    assert first.result(timeout=5).shape == (1,)
+    assert second.result(timeout=5).shape == (1,)
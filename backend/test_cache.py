@@ -0,0 +1,45 @@
+import os
+
+from cache import MemoryBackend, ResultCache, SQLiteBackend, model_fingerprint
+
+
+def test_model_fingerprint_changes_with_model_file(tmp_path):
+    model = tmp_path / "model.h5"
+    model.write_bytes(b"v1")
+    before = model_fingerprint(str(model))
+    model.write_bytes(b"version 2")
+    os.utime(model, ns=(0, 12345))
+
+    assert model_fingerprint(str(model)) != before
+
+
+def test_model_fingerprint_of_savedmodel_uses_graph_file(tmp_path):
+    (tmp_path / "saved_model.pb").write_bytes(b"graph")
+    assert model_fingerprint(str(tmp_path)) == model_fingerprint(str(tmp_path / "saved_model.pb"))
+
+
+def test_result_cache_is_disabled_until_a_model_is_set():
+    cache = ResultCache(local=MemoryBackend())
+    key = cache.content_key(b"image")
+    cache.put([key], [0.5, 0.5])
+
+    assert key is None
+    assert cache.get(key) is None
+    assert len(cache.local) == 0
+
+
+def test_result_cache_keys_results_by_model(tmp_path):
+    shared = SQLiteBackend(str(tmp_path / "results.sqlite"))
+    old_worker = ResultCache(local=MemoryBackend(), shared=shared)
+    old_worker.set_model("v1")
+    old_key = old_worker.content_key(b"image")
+    old_worker.put([old_key], [0.25, 0.75])
+
+    new_worker = ResultCache(local=MemoryBackend(), shared=shared)
+    new_worker.set_model("v2")
+    assert new_worker.get(new_worker.content_key(b"image")) is None
+    # Rows written for the old model are dropped from the shared backend
+    assert shared.get(old_key) is None
+
+    # A worker still running the old model keeps serving its own results
+    assert old_worker.get(old_key).tolist() == [0.25, 0.75]
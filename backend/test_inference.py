@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+from inference import MODEL_FILES, resolve_model
+
+H5 = MODEL_FILES["keras"]
+KERAS = os.path.splitext(H5)[0] + ".keras"
+SAVEDMODEL = MODEL_FILES["savedmodel"]
+
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("model")
+
+
+def write(path, mtime):
+    if path == SAVEDMODEL:
+        os.makedirs(path)
+        path = os.path.join(path, "saved_model.pb")
+    with open(path, "wb") as f:
+        f.write(b"model")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_auto_without_models_falls_back_to_h5(model_dir):
+    assert resolve_model() == ("keras", H5)
+
+
+def test_auto_serves_the_newest_model(model_dir):
+    write(SAVEDMODEL, 1_000)
+    write(KERAS, 2_000)
+    write(H5, 3_000)
+
+    assert resolve_model() == ("keras", H5)
+
+
+def test_auto_prefers_converted_models_written_after_training(model_dir):
+    write(H5, 1_000)
+    write(KERAS, 2_000)
+    write(SAVEDMODEL, 3_000)
+
+    assert resolve_model() == ("savedmodel", SAVEDMODEL)
+
+
+def test_equal_times_prefer_the_faster_format(model_dir):
+    for path in (H5, KERAS, SAVEDMODEL):
+        write(path, 1_000)
+
+    assert resolve_model() == ("savedmodel", SAVEDMODEL)
+    assert resolve_model("keras") == ("keras", KERAS)
+
+
+def test_explicit_backend_and_path_are_kept(model_dir):
+    write(H5, 1_000)
+    write(SAVEDMODEL, 2_000)
+
+    assert resolve_model("keras") == ("keras", H5)
+    assert resolve_model("auto", "other.h5") == ("keras", "other.h5")
+    assert resolve_model("int8") == ("int8", MODEL_FILES["int8"])
+
+
+def test_unknown_backend_is_rejected(model_dir):
+    with pytest.raises(ValueError, match="Unknown MODEL_BACKEND"):
+        resolve_model("onnx")
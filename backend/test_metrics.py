@@ -0,0 +1,45 @@
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def bucket_lines(lines):
+    return [line for line in lines if "_bucket" in line]
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 1.0, 3.0):
+        histogram.observe(value)
+
+    lines = histogram.render()
+    assert bucket_lines(lines) == [
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 4',
+        'latency_seconds_bucket{le="+Inf"} 5'
+    ]
+    assert "latency_seconds_sum 4.65" in lines
+    assert "latency_seconds_count 5" in lines
+
+
+def test_histogram_keeps_series_per_label():
+    histogram = Histogram("stage_seconds", "Stages", ["stage"], buckets=(1.0,))
+    histogram.observe(0.5, stage="decode")
+    histogram.observe(2.0, stage="inference")
+
+    assert bucket_lines(histogram.render()) == [
+        'stage_seconds_bucket{stage="decode",le="1.0"} 1',
+        'stage_seconds_bucket{stage="decode",le="+Inf"} 1',
+        'stage_seconds_bucket{stage="inference",le="1.0"} 0',
+        'stage_seconds_bucket{stage="inference",le="+Inf"} 1'
+    ]
+
+
+def test_registry_renders_counters_and_gauges():
+    registry = Registry()
+    requests = registry.register(Counter("requests_total", "Requests", ["outcome"]))
+    registry.register(Gauge("queue_depth", "Queue depth", lambda: 3))
+    requests.inc(outcome="known")
+    requests.inc(2, outcome="known")
+
+    text = registry.render()
+    assert '# TYPE requests_total counter\nrequests_total{outcome="known"} 3\n' in text
+    assert "# TYPE queue_depth gauge\nqueue_depth 3\n" in text
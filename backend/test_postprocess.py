@@ -0,0 +1,73 @@
+import json
+
+import numpy as np
+import pytest
+
+from postprocess import DEFAULT_THRESHOLD, Calibration, apply_temperature, fit_temperature, top_k
+
+
+def test_top_k_matches_full_sort():
+    scores = np.random.default_rng(0).random((50, 38))
+    indices, values = top_k(scores, 5)
+
+    expected = np.argsort(-scores, axis=1)[:, :5]
+    assert np.array_equal(indices, expected)
+    assert np.array_equal(values, np.take_along_axis(scores, expected, axis=1))
+
+
+def test_top_k_larger_than_class_count():
+    indices, _ = top_k(np.array([[0.2, 0.5, 0.3]]), 10)
+    assert indices.tolist() == [[1, 2, 0]]
+
+
+def test_fit_temperature_recovers_overconfidence():
+    rng = np.random.default_rng(0)
+    logits = rng.normal(size=(4000, 10)) * 3
+    scores = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+    # Labels drawn from the distribution the scores would have at temperature 2
+    true_probabilities = apply_temperature(scores, 2.0)
+    labels = np.array([rng.choice(10, p=p) for p in true_probabilities])
+
+    assert fit_temperature(scores, labels) == pytest.approx(2.0, rel=0.1)
+
+
+def test_calibration_applies_per_class_thresholds():
+    labels = ["a", "b", "c"]
+    calibration = Calibration(labels, default_threshold=70.0, thresholds={"b": 90.0})
+    scores = np.array([[0.8, 0.1, 0.1], [0.1, 0.8, 0.1]], dtype=np.float32)
+
+    indices, confidences, below_threshold = calibration.postprocess(scores, 2)
+    assert indices[:, 0].tolist() == [0, 1]
+    assert confidences[:, 0].tolist() == [80.0, 80.0]
+    assert below_threshold.tolist() == [False, True]
+
+
+def test_temperature_one_leaves_scores_unchanged():
+    scores = np.array([[0.7, 0.2, 0.1]])
+    assert apply_temperature(scores, 1.0) is scores
+
+
+def test_calibration_load_without_file_uses_defaults(tmp_path):
+    calibration = Calibration.load(str(tmp_path / "missing.json"), ["a", "b"], [])
+
+    assert calibration.temperature == 1.0
+    assert calibration.thresholds.tolist() == [DEFAULT_THRESHOLD, DEFAULT_THRESHOLD]
+
+
+def test_calibration_load_warns_about_unknown_classes(tmp_path):
+    path = tmp_path / "calibration.json"
+    path.write_text(json.dumps({"temperature": 1.5, "default_threshold": 60, "thresholds": {"b": 85, "z": 99}}))
+    warnings = []
+    calibration = Calibration.load(str(path), ["a", "b"], warnings)
+
+    assert calibration.temperature == 1.5
+    assert calibration.thresholds.tolist() == [60.0, 85.0]
+    assert len(warnings) == 1 and "'z'" in warnings[0]
+
+
+def test_calibration_load_rejects_non_positive_temperature(tmp_path):
+    path = tmp_path / "calibration.json"
+    path.write_text(json.dumps({"temperature": 0}))
+
+    with pytest.raises(ValueError, match="temperature"):
+        Calibration.load(str(path), ["a"], [])
@@ -0,0 +1,61 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import preprocessing
+from preprocessing import ImageRejectedError, decode_image, open_image, to_array
+
+
+def encode(img, fmt="PNG"):
+    buffer = io.BytesIO()
+    img.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def test_open_image_rejects_oversized_uploads(monkeypatch):
+    data = encode(Image.new("RGB", (8, 8)))
+    monkeypatch.setattr(preprocessing, "MAX_UPLOAD_BYTES", len(data) - 1)
+
+    with pytest.raises(ImageRejectedError, match="bytes"):
+        open_image(data)
+
+
+def test_open_image_rejects_too_many_pixels(monkeypatch):
+    data = encode(Image.new("RGB", (100, 100)))
+    monkeypatch.setattr(preprocessing, "MAX_PIXELS", 100 * 100 - 1)
+
+    with pytest.raises(ImageRejectedError, match="100x100"):
+        open_image(data)
+
+
+def test_open_image_converts_to_rgb():
+    img = open_image(encode(Image.new("L", (20, 10), 128)))
+    assert img.mode == "RGB"
+    assert img.size == (20, 10)
+
+
+def test_decode_image_resizes_to_model_input():
+    img = decode_image(encode(Image.new("RGB", (300, 200), (255, 0, 0)), "JPEG"))
+    assert img.size == preprocessing.IMG_SIZE
+
+
+def test_to_array_uint8_and_float32():
+    img = Image.new("RGB", (4, 4), (255, 0, 51))
+
+    pixels = to_array(img)
+    assert pixels.dtype == np.uint8
+    assert pixels[0, 0].tolist() == [255, 0, 51]
+
+    scaled = to_array(img, dtype=np.float32)
+    assert scaled.dtype == np.float32
+    assert scaled[0, 0].tolist() == pytest.approx([1.0, 0.0, 0.2])
+
+
+def test_to_array_writes_into_out():
+    out = np.zeros((4, 4, 3), dtype=np.float32)
+    result = to_array(Image.new("RGB", (4, 4), (255, 255, 255)), dtype=np.float32, out=out)
+
+    assert result is out
+    assert np.all(out == 1.0)
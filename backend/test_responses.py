@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+
+import numpy as np
+import pytest
+
+from responses import ReloadingResponseTable, ResponseTable, ResponseTableError
+
+
+@pytest.fixture
+def response_files(tmp_path):
+    labels_path = tmp_path / "class_indices.json"
+    labels_path.write_text(json.dumps({"0": "Apple___healthy", "1": "unknown"}))
+    info_path = tmp_path / "disease_info.json"
+    info_path.write_text(
+        '{"version": 2, "diseases": {'
+        '"Apple___healthy": {"cause": "old"}, '
+        '"Apple___healthy": {"cause": "None"}, '
+        '"unknown": {"cause": "Unrecognized"}}}'
+    )
+    return labels_path, info_path
+
+
+def test_response_table_warns_about_duplicate_keys(response_files):
+    table = ResponseTable(*response_files)
+
+    assert table.version == 2
+    assert any("duplicate key 'Apple___healthy'" in warning for warning in table.warnings)
+    assert json.loads(table.render(0, 91.5))["cause"] == "None"
+
+
+@pytest.mark.parametrize("labels", [
+    {"0": "Apple___healthy", "01": "unknown"},
+    {"0": "Apple___healthy", "2": "unknown"},
+    {"0": "Apple___healthy", "1": ["unknown"]},
+    ["Apple___healthy", "unknown"]
+])
+def test_response_table_rejects_malformed_class_indices(response_files, labels):
+    labels_path, info_path = response_files
+    labels_path.write_text(json.dumps(labels))
+
+    with pytest.raises(ResponseTableError):
+        ResponseTable(labels_path, info_path)
+
+
+def bump_mtime(path):
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_reload_keeps_serving_after_a_bad_edit(response_files, caplog):
+    labels_path, info_path = response_files
+    logger = logging.getLogger("responses-test")
+    reloading = ReloadingResponseTable(labels_path, info_path, check_interval=0, logger=logger)
+    original = reloading.current()
+
+    labels_path.write_text(json.dumps({"0": "Apple___healthy", "01": "unknown"}))
+    bump_mtime(labels_path)
+    with caplog.at_level(logging.ERROR, logger="responses-test"):
+        assert reloading.current() is original
+        assert reloading.current() is original
+    # Reported once for this version of the files
+    assert len([r for r in caplog.records if "reload failed" in r.getMessage()]) == 1
+
+    labels_path.write_text(json.dumps({"0": "Apple___healthy", "1": "unknown"}))
+    bump_mtime(labels_path)
+    reloaded = reloading.current()
+    assert reloaded is not original
+    assert reloaded.labels == ["Apple___healthy", "unknown"]
+
+
+def test_response_table_renders_batches_with_top_k(response_files):
+    table = ResponseTable(*response_files)
+    rendered = table.render_batch(np.array([[0.9, 0.1], [0.5, 0.5], [0.2, 0.8]]), top_k=2)
+
+    bodies = [json.loads(body) for body, _ in rendered]
+    assert [unknown for _, unknown in rendered] == [False, True, True]
+    assert bodies[0]["class"] == "Apple___healthy"
+    assert bodies[0]["top_k"] == [
+        {"class": "Apple___healthy", "confidence": 90.0},
+        {"class": "unknown", "confidence": 10.0}
+    ]
+    assert bodies[2]["class"] == "Unknown"
@@ -0,0 +1,63 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from uploads import expand_upload
+
+
+def make_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def test_expand_upload_passes_plain_files_through():
+    assert expand_upload("leaf.jpg", b"jpeg", 10, 100, 100) == [("leaf.jpg", b"jpeg")]
+
+
+def test_expand_upload_skips_metadata_entries():
+    data = make_zip({"a.jpg": b"a", "__MACOSX/._a.jpg": b"x", "dir/.DS_Store": b"x"})
+    assert expand_upload("photos.zip", data, 10, 100, 100) == [("a.jpg", b"a")]
+
+
+def test_expand_upload_rejects_oversized_members_before_reading():
+    bomb = make_zip({"bomb.jpg": b"\0" * 10_000_000})
+    assert len(bomb) < 100_000
+
+    with pytest.raises(ValueError, match="bomb.jpg"):
+        expand_upload("bomb.zip", bomb, 10, 1_000_000, 50_000_000)
+
+
+def test_expand_upload_enforces_total_budget_and_file_count():
+    data = make_zip({f"{i}.jpg": b"\0" * 600 for i in range(3)})
+
+    with pytest.raises(ValueError, match="expands to more than 1500 bytes"):
+        expand_upload("photos.zip", data, 10, 1000, 1500)
+    with pytest.raises(ValueError, match="contains more than 2 files"):
+        expand_upload("photos.zip", data, 2, 1000, 5000)
+
+
+def make_tar(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+def test_expand_upload_reads_tar_members():
+    data = make_tar({"a.jpg": b"aa", "b.jpg": b"bbb"})
+    assert expand_upload("photos.tar.gz", data, 10, 100, 100) == [("a.jpg", b"aa"), ("b.jpg", b"bbb")]
+
+
+def test_expand_upload_stops_reading_tar_at_entry_limit():
+    data = make_tar({f".meta{i}": b"" for i in range(1000)})
+
+    with pytest.raises(ValueError, match="more than 8 entries"):
+        expand_upload("photos.tar.gz", data, 2, 100, 100)
@@ -0,0 +1,68 @@
+import io
+import os
+import tarfile
+import zipfile
+
+
+# Directories and metadata entries count toward this many entries per allowed file
+ENTRIES_PER_FILE = 4
+
+
+# Expand an uploaded file into (name, bytes) pairs; archives yield their members.
+# Limits are checked member by member, before each member is decompressed
+def expand_upload(filename, data, max_files, max_file_bytes, max_total_bytes):
+    buffer = io.BytesIO(data)
+    limits = (max_files, max_file_bytes, max_total_bytes)
+
+    if zipfile.is_zipfile(buffer):
+        with zipfile.ZipFile(buffer) as archive:
+            members = [m for m in archive.infolist() if not m.is_dir() and _is_image_name(m.filename)]
+            total = 0
+            for count, member in enumerate(members, 1):
+                total = _check_member(member.filename, member.file_size, count, total, *limits)
+            return [(m.filename, _read_limited(archive.open(m), m.filename, max_file_bytes)) for m in members]
+
+    buffer.seek(0)
+    try:
+        archive = tarfile.open(fileobj=buffer, mode="r:*")
+    except tarfile.TarError:
+        return [(filename, data)]
+
+    # Tar headers are only known by reading the stream, so stop as soon as a limit is hit
+    with archive:
+        members, total = [], 0
+        for entries, member in enumerate(archive, 1):
+            if entries > max_files * ENTRIES_PER_FILE:
+                raise ValueError(f"Archive has more than {max_files * ENTRIES_PER_FILE} entries")
+            if not member.isfile() or not _is_image_name(member.name):
+                continue
+            total = _check_member(member.name, member.size, len(members) + 1, total, *limits)
+            members.append((member.name, _read_limited(archive.extractfile(member), member.name, max_file_bytes)))
+        return members
+
+
+# Skip OS metadata entries that archivers add next to the real photos
+def _is_image_name(name):
+    base = os.path.basename(name)
+    return not name.startswith("__MACOSX/") and not base.startswith(".")
+
+
+# Check the `count`th member against the limits; returns the new running total size
+def _check_member(name, size, count, total, max_files, max_file_bytes, max_total_bytes):
+    if count > max_files:
+        raise ValueError(f"Archive contains more than {max_files} files")
+    if size > max_file_bytes:
+        raise ValueError(f"Archive member {name!r} is {size} bytes, limit is {max_file_bytes}")
+    total += size
+    if total > max_total_bytes:
+        raise ValueError(f"Archive expands to more than {max_total_bytes} bytes")
+    return total
+
+
+# The declared size can lie; never decompress more than the limit allows
+def _read_limited(stream, name, max_file_bytes):
+    with stream:
+        data = stream.read(max_file_bytes + 1)
+    if len(data) > max_file_bytes:
+        raise ValueError(f"Archive member {name!r} is larger than {max_file_bytes} bytes")
+    return data